@@ -10,6 +10,9 @@ import time
 import altair as alt
 from urllib.error import URLError
 import re
+import os
+from figcache import cached_figure
+from schema import apply_schema, SCHEMAS
 
 # Set page configuration
 st.set_page_config(
@@ -21,11 +24,14 @@ st.set_page_config(
 # Define your API key here (or use environment variables in production)
 API_KEY = "unrdj3eDQReaMA62Vbl3V4jKHhJy74TZjAey3deh"  # Replace with your actual API key
 
+# Point at a local stand-in (e.g. the load-test fixtures server) with CONGRESS_API_URL
+API_BASE = os.environ.get("CONGRESS_API_URL", "https://api.congress.gov/v3").rstrip("/")
+
 # Cache data to improve performance
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def fetch_recent_bills(congress, chamber, limit=25, offset=0):
     """Fetch recent bills from the Congress.gov API"""
-    url = f"https://api.congress.gov/v3/bill/{congress}/{chamber.lower()}?api_key={API_KEY}&limit={limit}&offset={offset}"
+    url = f"{API_BASE}/bill/{congress}/{chamber.lower()}?api_key={API_KEY}&limit={limit}&offset={offset}"
     
     try:
         response = requests.get(url)
@@ -76,7 +82,7 @@ def fetch_recent_bills(congress, chamber, limit=25, offset=0):
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def fetch_bill_subjects(congress, bill_type, bill_number):
     """Fetch subjects for a specific bill"""
-    url = f"https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_number}?api_key={API_KEY}"
+    url = f"{API_BASE}/bill/{congress}/{bill_type}/{bill_number}?api_key={API_KEY}"
     
     try:
         response = requests.get(url)
@@ -96,7 +102,7 @@ def fetch_bill_subjects(congress, bill_type, bill_number):
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def fetch_bill_actions(congress, bill_type, bill_number):
     """Fetch actions for a specific bill"""
-    url = f"https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_number}/actions?api_key={API_KEY}"
+    url = f"{API_BASE}/bill/{congress}/{bill_type}/{bill_number}/actions?api_key={API_KEY}"
     
     try:
         response = requests.get(url)
@@ -126,7 +132,7 @@ def fetch_bill_actions(congress, bill_type, bill_number):
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def fetch_bill_votes(congress, bill_type, bill_number):
     """Fetch votes for a specific bill"""
-    url = f"https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_number}/votes?api_key={API_KEY}"
+    url = f"{API_BASE}/bill/{congress}/{bill_type}/{bill_number}/votes?api_key={API_KEY}"
     
     try:
         response = requests.get(url)
@@ -198,7 +204,7 @@ def fetch_bill_votes(congress, bill_type, bill_number):
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def fetch_bill_text(congress, bill_type, bill_number):
     """Fetch text versions for a specific bill"""
-    url = f"https://api.congress.gov/v3/bill/{congress}/{bill_type}/{bill_number}/text?api_key={API_KEY}"
+    url = f"{API_BASE}/bill/{congress}/{bill_type}/{bill_number}/text?api_key={API_KEY}"
     
     try:
         response = requests.get(url)
@@ -331,8 +337,8 @@ def main():
             st.info("Try changing your filters or try again later.")
             return
         
-        # Convert to DataFrame for easier filtering
-        bills_df = pd.DataFrame(bills)
+        # Convert to DataFrame for easier filtering, with compact dtypes
+        bills_df = apply_schema(pd.DataFrame(bills), SCHEMAS["bills"])
         
         # Apply filters
         if bill_type_filter != "All Types":
@@ -382,25 +388,26 @@ def main():
             st.metric("Avg. Cosponsors", f"{avg_cosponsors:.1f}")
         
         # Party breakdown visualization
-        party_counts = bills_df['sponsor_party'].value_counts().reset_index()
+        party_counts = bills_df['sponsor_party'].value_counts()
+        party_counts = party_counts[party_counts > 0].reset_index()
         party_counts.columns = ['party', 'count']
         
         # Create pie chart for party breakdown
         if not party_counts.empty:
             st.subheader("Bill Sponsorship by Party")
             
-            fig_party = px.pie(
+            fig_party = cached_figure(
+                px.pie,
                 party_counts, 
                 values='count', 
                 names='party',
                 color='party',
                 color_discrete_map={'D': '#3182ce', 'R': '#e53e3e', '': '#718096'},
-                title="Bills Sponsored by Party"
+                title="Bills Sponsored by Party",
+                traces=dict(textinfo='percent+label'),
+                layout=dict(height=400)
             )
             
-            fig_party.update_traces(textinfo='percent+label')
-            fig_party.update_layout(height=400)
-            
             st.plotly_chart(fig_party, use_container_width=True)
             
             # Add legislative narrative
@@ -622,7 +629,8 @@ def main():
                                     
                                     vote_results_df = pd.DataFrame(vote_results)
                                     
-                                    fig_vote = px.pie(
+                                    fig_vote = cached_figure(
+                                        px.pie,
                                         vote_results_df,
                                         values='Count',
                                         names='Category',
@@ -633,11 +641,10 @@ def main():
                                             'Present': '#9E9E9E',
                                             'Not Voting': '#BDBDBD'
                                         },
-                                        title="Overall Vote Results"
+                                        title="Overall Vote Results",
+                                        traces=dict(textinfo='percent+label')
                                     )
                                     
-                                    fig_vote.update_traces(textinfo='percent+label')
-                                    
                                     st.plotly_chart(fig_vote, use_container_width=True)
                                     
                                     # Party breakdown visualization
@@ -654,18 +661,18 @@ def main():
                                         party_vote_df = pd.DataFrame(party_vote_data)
                                         
                                         # Stacked bar chart for party breakdown
-                                        fig_party_vote = px.bar(
+                                        fig_party_vote = cached_figure(
+                                            px.bar,
                                             party_vote_df,
                                             x='Party',
                                             y='Count',
                                             color='Vote',
                                             barmode='stack',
                                             color_discrete_map={'Yea': '#4CAF50', 'Nay': '#F44336'},
-                                            title="Votes by Party"
+                                            title="Votes by Party",
+                                            layout=dict(height=400)
                                         )
                                         
-                                        fig_party_vote.update_layout(height=400)
-                                        
                                         st.plotly_chart(fig_party_vote, use_container_width=True)
                                         
                                         # Calculate party line voting
@@ -0,0 +1,116 @@
+"""Local, simplified US county geometry for the choropleth maps.
+
+For every zoom level in ZOOM_LEVELS a simplified copy of the whole county
+coverage is precomputed and committed under data/geo, so maps render offline
+from a fresh clone and only receive the counties they actually colour.
+`datebooks counties --force` regenerates the levels from the Census cartographic
+boundary file, which is downloaded into data/geo (and not committed) the first
+time a rebuild needs it.
+"""
+import json
+import math
+from functools import lru_cache
+from pathlib import Path
+
+import geopandas as gpd
+import requests
+
+COUNTY_SOURCE_URL = "https://www2.census.gov/geo/tiger/GENZ2016/shp/cb_2016_us_county_500k.zip"
+GEO_DIR = Path(__file__).parent / "data" / "geo"
+SOURCE_PATH = GEO_DIR / "cb_2016_us_county_500k.zip"
+
+# Map zoom levels we keep a simplified coverage for
+ZOOM_LEVELS = (2, 4, 6, 8)
+
+
+def tolerance_for_zoom(zoom):
+    """Simplification tolerance in degrees: about one screen pixel at the given zoom"""
+    return 360 / (256 * 2 ** zoom)
+
+
+def level_for_zoom(zoom):
+    """Pick the coarsest precomputed level that is still detailed enough for a zoom"""
+    for level in ZOOM_LEVELS:
+        if level >= zoom:
+            return level
+    return ZOOM_LEVELS[-1]
+
+
+def simplified_path(level):
+    return GEO_DIR / f"counties_z{level}.geojson"
+
+
+def fetch_counties(url=COUNTY_SOURCE_URL, path=SOURCE_PATH):
+    """Download the full-resolution county shapes once and keep them on disk"""
+    if not path.exists():
+        response = requests.get(url, timeout=60)
+        response.raise_for_status()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(response.content)
+    return path
+
+
+def load_counties(path=SOURCE_PATH):
+    """Read the full-resolution county shapes, indexed by 5-digit FIPS code"""
+    gdf = gpd.read_file(fetch_counties(path=path))
+    if gdf.crs is None:
+        # The Census files are NAD83 lon/lat
+        gdf = gdf.set_crs("EPSG:4269")
+    gdf.index = gdf["GEOID"].astype(str).str.zfill(5).rename("fips")
+    return gdf[["geometry"]].sort_index()
+
+
+def simplify_counties(gdf, tolerance):
+    """Simplify the county coverage without opening gaps between neighbours"""
+    geometry = gdf.geometry
+    if hasattr(geometry, "simplify_coverage"):
+        # Shared edges are simplified once, so neighbouring counties stay flush
+        simplified = geometry.simplify_coverage(tolerance)
+    else:
+        # Older geopandas/shapely: per-polygon simplification that still keeps
+        # every shape valid; any slivers are below one pixel at this zoom
+        simplified = geometry.simplify(tolerance, preserve_topology=True)
+    return gdf.set_geometry(simplified)
+
+
+def build_levels(force=False):
+    """Precompute the simplified coverage for every zoom level; returns the levels built"""
+    counties = None
+    built = []
+    for level in ZOOM_LEVELS:
+        path = simplified_path(level)
+        if path.exists() and not force:
+            continue
+        if counties is None:
+            counties = load_counties()
+        tolerance = tolerance_for_zoom(level)
+        simplified = simplify_counties(counties, tolerance)
+        # Coordinates finer than the tolerance carry no visible detail
+        precision = max(int(math.ceil(-math.log10(tolerance))) + 1, 1)
+        simplified["geometry"] = simplified.geometry.set_precision(10 ** -precision)
+        simplified.to_file(path, driver="GeoJSON", index=True)
+        built.append(level)
+    return built
+
+
+@lru_cache(maxsize=None)
+def load_level(level):
+    """Simplified county coverage for a precomputed zoom level"""
+    path = simplified_path(level)
+    if not path.exists():
+        build_levels()
+    gdf = gpd.read_file(path)
+    gdf.index = gdf.pop("fips").astype(str).str.zfill(5)
+    return gdf[["geometry"]]
+
+
+def county_geojson(fips_codes, zoom=4):
+    """GeoJSON dict with only the given counties, simplified for the map zoom.
+
+    Feature ids are the 5-digit FIPS codes, so the result can be passed straight
+    to plotly's `geojson=` argument with `locations` set to the FIPS column.
+    """
+    counties = load_level(level_for_zoom(zoom))
+    wanted = sorted({str(code).zfill(5) for code in fips_codes})
+    subset = counties[counties.index.isin(wanted)]
+    return json.loads(subset.to_json(drop_id=False))
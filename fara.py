@@ -0,0 +1,192 @@
+"""Streaming ingestion of the FARA bulk files for the foreign-lobbying maps.
+
+The receipts bulk CSV is read in chunks, country names are normalised to ISO3
+with a memoised pycountry lookup, and spending is aggregated per country and
+year as the chunks stream past, so memory only grows with the number of
+countries x years. `datebooks fara RECEIPTS.csv` writes the result to
+data/fara_spending.parquet, which the maps load directly; until it has been
+run they fall back to the all-years top-10 totals bundled in data/fara_seed.csv.
+"""
+import difflib
+import logging
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+import pycountry
+
+from lobbying import load_centroids
+
+SPENDING_PATH = Path(__file__).parent / "data" / "fara_spending.parquet"
+SEED_PATH = Path(__file__).parent / "data" / "fara_seed.csv"
+CHUNK_SIZE = 200_000
+# How close a misspelt name must be to a country name to count as it
+FUZZY_CUTOFF = 0.85
+
+logger = logging.getLogger(__name__)
+
+# Column names in the FARA bulk exports
+RECEIPT_COLUMNS = {
+    "registration": "Registration Number",
+    "country": "Foreign Principal Country",
+    "amount": "Amount",
+    "date": "Date",
+}
+REGISTRANT_COLUMNS = {
+    "registration": "Registration Number",
+}
+
+# FARA spellings pycountry doesn't resolve (or resolves wrongly)
+COUNTRY_ALIASES = {
+    "KOREA, SOUTH": "KOR",
+    "SOUTH KOREA": "KOR",
+    "KOREA, NORTH": "PRK",
+    "NORTH KOREA": "PRK",
+    "TURKEY": "TUR",
+    "BURMA": "MMR",
+    "IVORY COAST": "CIV",
+    "CONGO, DEMOCRATIC REPUBLIC OF": "COD",
+    "CONGO, REPUBLIC OF": "COG",
+    "KOSOVO": "XKX",
+    "RUSSIA": "RUS",
+    "MACEDONIA": "MKD",
+}
+
+
+@lru_cache(maxsize=None)
+def country_names():
+    """Upper-cased country names (short, official and common) -> ISO3"""
+    names = {}
+    for country in pycountry.countries:
+        for attribute in ("name", "official_name", "common_name"):
+            if hasattr(country, attribute):
+                names[getattr(country, attribute).upper()] = country.alpha_3
+    return names
+
+
+@lru_cache(maxsize=None)
+def country_to_iso3(name):
+    """ISO3 code for a FARA country name, or None if it isn't a country.
+
+    Only country-level names match: pycountry's fuzzy search also matches
+    subdivisions ("NEW YORK" -> USA), so misspellings are only compared with
+    country names, and names of states or regions are logged and dropped.
+    """
+    if not isinstance(name, str) or not name.strip():
+        return None
+    name = name.strip().upper()
+    if name in COUNTRY_ALIASES:
+        return COUNTRY_ALIASES[name]
+    try:
+        return pycountry.countries.lookup(name).alpha_3
+    except LookupError:
+        pass
+    # "BAHAMAS, THE" / "THE GAMBIA"
+    stripped = name.removesuffix(", THE").removeprefix("THE ")
+    names = country_names()
+    if stripped in names:
+        return names[stripped]
+    close = difflib.get_close_matches(stripped, names, n=1, cutoff=FUZZY_CUTOFF)
+    if close:
+        return names[close[0]]
+    try:
+        subdivision = pycountry.subdivisions.lookup(name)
+        logger.warning("Dropping %r: a subdivision (%s), not a country", name, subdivision.code)
+    except LookupError:
+        logger.warning("Dropping %r: not a recognised country", name)
+    return None
+
+
+def country_name(iso3):
+    """Display name for an ISO3 code"""
+    country = pycountry.countries.get(alpha_3=iso3)
+    if country is None:
+        return iso3
+    return getattr(country, "common_name", country.name)
+
+
+def parse_amounts(values):
+    """Dollar amounts like "$1,234.50" to floats"""
+    cleaned = values.astype(str).str.replace(r"[$,\s]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").fillna(0)
+
+
+def read_registrations(path, chunksize=CHUNK_SIZE):
+    """Registration numbers from the registrants bulk file"""
+    registrations = set()
+    for chunk in pd.read_csv(path, usecols=[REGISTRANT_COLUMNS["registration"]], dtype=str, chunksize=chunksize):
+        registrations.update(chunk[REGISTRANT_COLUMNS["registration"]].dropna().str.strip())
+    return registrations
+
+
+def aggregate_receipts(path, registrations=None, chunksize=CHUNK_SIZE):
+    """Stream the receipts bulk file into per country-year totals.
+
+    When `registrations` is given, receipts filed under other registration
+    numbers are skipped.
+    """
+    columns = RECEIPT_COLUMNS
+    partials = []
+    registrants = {}
+    for chunk in pd.read_csv(path, usecols=list(columns.values()), dtype=str, chunksize=chunksize):
+        chunk = chunk.rename(columns={v: k for k, v in columns.items()})
+        chunk["registration"] = chunk["registration"].str.strip()
+        if registrations is not None:
+            chunk = chunk[chunk["registration"].isin(registrations)]
+
+        # Each distinct spelling is resolved once per process
+        countries = chunk["country"].str.strip().str.upper()
+        chunk["iso_alpha"] = countries.map({name: country_to_iso3(name) for name in countries.dropna().unique()})
+        chunk["Year"] = pd.to_datetime(chunk["date"], errors="coerce", format="mixed").dt.year
+        chunk["amount"] = parse_amounts(chunk["amount"])
+        chunk = chunk.dropna(subset=["iso_alpha", "Year"])
+
+        grouped = chunk.groupby(["iso_alpha", "Year"])
+        partials.append(grouped["amount"].agg(Total_Spending="sum", Receipts="count"))
+        for key, numbers in grouped["registration"].unique().items():
+            registrants.setdefault(key, set()).update(numbers)
+
+        # Fold partial results together so memory doesn't grow with the file
+        if len(partials) > 1:
+            partials = [pd.concat(partials).groupby(level=[0, 1]).sum()]
+
+    if not partials:
+        return pd.DataFrame(columns=["iso_alpha", "Year", "Total_Spending", "Receipts", "Registrants"])
+    totals = pd.concat(partials).groupby(level=[0, 1]).sum()
+    totals["Registrants"] = pd.Series({key: len(numbers) for key, numbers in registrants.items()})
+    totals = totals.reset_index()
+    totals["Year"] = totals["Year"].astype("int16")
+    return totals
+
+
+def ingest(receipts_path, registrants_path=None, output=SPENDING_PATH, chunksize=CHUNK_SIZE):
+    """Aggregate the FARA bulk files and write the columnar spending table"""
+    registrations = None
+    if registrants_path is not None:
+        registrations = read_registrations(registrants_path, chunksize)
+    totals = aggregate_receipts(receipts_path, registrations, chunksize)
+    totals.insert(1, "Country", totals["iso_alpha"].map(country_name))
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    totals.to_parquet(output, index=False)
+    return totals
+
+
+def read_spending(path=SPENDING_PATH, seed_path=SEED_PATH):
+    """Ingested spending table, or the bundled seed totals if nothing was ingested yet"""
+    if Path(path).exists():
+        return pd.read_parquet(path)
+    return pd.read_csv(seed_path)
+
+
+def load_spending(path=SPENDING_PATH, years=None):
+    """Total spending per country, with coordinates for the maps"""
+    spending = read_spending(path)
+    if years is not None:
+        if "Year" not in spending.columns:
+            raise ValueError("The seed totals have no years; run `datebooks fara` to filter by year")
+        spending = spending[spending["Year"].isin(years)]
+    columns = [column for column in ("Total_Spending", "Receipts") if column in spending.columns]
+    totals = spending.groupby(["iso_alpha", "Country"], as_index=False)[columns].sum()
+    totals = totals.join(load_centroids(), on="iso_alpha", how="inner")
+    return totals.sort_values("Total_Spending", ascending=False, ignore_index=True)
@@ -0,0 +1,159 @@
+"""Cross-app cache of serialized Plotly figures.
+
+Figures are keyed by a fingerprint of the input frame plus the plotting
+function and its arguments, and stored as figure JSON in two LRU tiers: an
+in-process memory tier shared by every Streamlit session, and a disk tier under
+data/cache/figures shared across processes and restarts. On a hit the figure
+is rebuilt from its JSON, skipping plotly express and its data processing;
+displaying it (`st.plotly_chart`, `fig.show`) still serializes it again.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+CACHE_DIR = Path(__file__).parent / "data" / "cache" / "figures"
+MEMORY_ENTRIES = 128
+DISK_ENTRIES = 2048
+
+
+def frame_fingerprint(df):
+    """Hash of a frame's columns, dtypes and values"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def argument_key(value):
+    """JSON-friendly stand-in for a plotting argument json can't encode.
+
+    Arrays and pandas objects are hashed by content: their repr is truncated,
+    so different data could otherwise share a key.
+    """
+    if isinstance(value, pd.DataFrame):
+        return {"frame": frame_fingerprint(value)}
+    if isinstance(value, pd.Series):
+        return {"series": frame_fingerprint(value.to_frame())}
+    if isinstance(value, pd.Index):
+        return {"index": frame_fingerprint(value.to_frame(index=False))}
+    if isinstance(value, np.ndarray):
+        digest = hashlib.sha256(f"{value.dtype}|{value.shape}".encode())
+        digest.update(pd.util.hash_array(value.ravel()).tobytes())
+        return {"array": digest.hexdigest()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    return repr(value)
+
+
+def figure_key(plot, df, kwargs):
+    """Cache key for `plot(df, **kwargs)`"""
+    name = f"{getattr(plot, '__module__', '')}.{getattr(plot, '__qualname__', repr(plot))}"
+    args = json.dumps(kwargs, sort_keys=True, default=argument_key)
+    return hashlib.sha256(f"{name}|{args}|{frame_fingerprint(df)}".encode()).hexdigest()[:40]
+
+
+class FigureCache:
+    """Memory + disk LRU cache of figure JSON"""
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _disk_path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key):
+        """Figure JSON for a key, or None"""
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                return self.memory[key]
+        path = self._disk_path(key)
+        try:
+            figure_json = path.read_text()
+        except FileNotFoundError:
+            return None
+        # Touch so disk eviction sees this entry as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process since we read it; the JSON is still good
+            pass
+        self._remember(key, figure_json)
+        return figure_json
+
+    def put(self, key, figure_json):
+        self._remember(key, figure_json)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._disk_path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(figure_json)
+        tmp.replace(path)
+        self._evict_disk()
+
+    def _remember(self, key, figure_json):
+        with self.lock:
+            self.memory[key] = figure_json
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def _evict_disk(self):
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                # Already evicted by another process
+                continue
+        if len(entries) <= self.disk_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.disk_entries]:
+            path.unlink(missing_ok=True)
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+        for path in self.cache_dir.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    def figure(self, plot, df, layout=None, traces=None, **kwargs):
+        """`plot(df, **kwargs)` with optional layout/trace updates, served from the cache.
+
+        `layout` and `traces` are passed to `update_layout` / `update_traces`
+        and are part of the key, like the plotting arguments.
+        """
+        key = figure_key(plot, df, {"kwargs": kwargs, "layout": layout, "traces": traces})
+        figure_json = self.get(key)
+        if figure_json is not None:
+            return pio.from_json(figure_json, skip_invalid=True)
+
+        fig = plot(df, **kwargs)
+        if traces:
+            fig.update_traces(**traces)
+        if layout:
+            fig.update_layout(**layout)
+        self.put(key, fig.to_json())
+        return fig
+
+
+# Shared by every app and session in the process
+figure_cache = FigureCache()
+
+
+def cached_figure(plot, df, layout=None, traces=None, **kwargs):
+    """Module-level shortcut for `figure_cache.figure`"""
+    return figure_cache.figure(plot, df, layout=layout, traces=traces, **kwargs)
@@ -1,5 +1,106 @@
-def main():
-    print("Hello from datebooks!")
+import argparse
+
+
+def build_command(args):
+    from store import build
+
+    built = build(args.datasets or None, force=args.force, workers=args.workers)
+    if built:
+        print(f"Built {', '.join(sorted(built))}")
+    else:
+        print("All datasets are up to date")
+
+
+def counties_command(args):
+    from counties import build_levels
+
+    built = build_levels(force=args.force)
+    if built:
+        print(f"Built county levels {', '.join(f'z{level}' for level in built)}")
+    else:
+        print("County levels are up to date")
+
+
+def fara_command(args):
+    from fara import CHUNK_SIZE, SPENDING_PATH, ingest
+
+    output = args.output or SPENDING_PATH
+    totals = ingest(args.receipts, args.registrants, output, args.chunksize or CHUNK_SIZE)
+    print(f"Wrote {len(totals)} country-year rows to {output}")
+
+
+def notebooks_command(args):
+    from notebooks import run_notebooks
+
+    for summary in run_notebooks(args.notebooks or None, workers=args.workers):
+        status = f"error in {summary['error']}" if summary["error"] else "ok"
+        print(f"{summary['notebook']}: {summary['executed']} executed, {summary['cached']} cached, {status}")
+
+
+def loadtest_command(args):
+    from loadtest import run
+
+    results, regressions, skipped = run(args.apps or None, args.sessions, args.iterations, args.save_baseline)
+    for app, metrics in results.items():
+        print(f"{app}: " + ", ".join(f"{name}={value}" for name, value in metrics.items()))
+    for note in skipped:
+        print(f"NOT COMPARED {note}")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        raise SystemExit(1)
+
+
+def memory_command(args):
+    from schema import SCHEMAS, apply_schema, memory_report
+    from store import DATASETS, load_dataset
+
+    names = args.datasets or list(DATASETS)
+    raw = {name: load_dataset(name) for name in names}
+    compact = {name: apply_schema(df, SCHEMAS.get(name, {})) for name, df in raw.items()}
+    report = memory_report(raw).join(memory_report(compact)[["MB"]], rsuffix=" compact")
+    print(report[["rows", "MB", "MB compact"]].to_string())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="datebooks", description="Datebooks data tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="precompute cleaned datasets into data/store")
+    build_parser.add_argument("datasets", nargs="*", help="datasets to build (default: all)")
+    build_parser.add_argument("--force", action="store_true", help="rebuild even if inputs are unchanged")
+    build_parser.add_argument("--workers", type=int, help="parallel build processes")
+    build_parser.set_defaults(func=build_command)
+
+    counties_parser = subparsers.add_parser("counties", help="precompute the simplified county shapes in data/geo")
+    counties_parser.add_argument("--force", action="store_true", help="rebuild levels that already exist")
+    counties_parser.set_defaults(func=counties_command)
+
+    fara_parser = subparsers.add_parser("fara", help="aggregate FARA bulk files into data/fara_spending.parquet")
+    fara_parser.add_argument("receipts", help="FARA receipts bulk CSV")
+    fara_parser.add_argument("--registrants", help="FARA registrants bulk CSV, to restrict to listed registrations")
+    fara_parser.add_argument("--output", help="where to write the spending table (default: data/fara_spending.parquet)")
+    fara_parser.add_argument("--chunksize", type=int, help="rows read per chunk")
+    fara_parser.set_defaults(func=fara_command)
+
+    notebooks_parser = subparsers.add_parser("notebooks", help="re-run notebooks headlessly, reusing cached cell outputs")
+    notebooks_parser.add_argument("notebooks", nargs="*", help="notebooks to run (default: all)")
+    notebooks_parser.add_argument("--workers", type=int, help="notebooks run in parallel")
+    notebooks_parser.set_defaults(func=notebooks_command)
+
+    loadtest_parser = subparsers.add_parser("loadtest", help="simulate concurrent sessions against the Streamlit apps")
+    loadtest_parser.add_argument("apps", nargs="*", help="apps to test (default: all)")
+    loadtest_parser.add_argument("--sessions", type=int, default=10, help="concurrent sessions per app")
+    loadtest_parser.add_argument("--iterations", type=int, default=5, help="interaction rounds per session")
+    loadtest_parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    loadtest_parser.set_defaults(func=loadtest_command)
+
+    memory_parser = subparsers.add_parser("memory", help="report per-dataset memory with and without compact dtypes")
+    memory_parser.add_argument("datasets", nargs="*", help="datasets to report (default: all)")
+    memory_parser.set_defaults(func=memory_command)
+
+    args = parser.parse_args(argv)
+    args.func(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+"""Concurrent-session load test for the Streamlit apps.
+
+Each simulated session is its own `AppTest` driving realistic widget
+interactions (switching categories, loading and picking bills, ...) in its own
+worker process. AppTest can only execute one rerun at a time per process, so
+processes are what let sessions really overlap: they start together and
+compete for CPU and for the on-disk caches, and their latencies include that
+contention. congress.py is pointed at a local Congress.gov stand-in serving
+deterministic fixtures, so runs are offline and repeatable. Per app we report
+the cold first render on its own, then p50/p95/p99 latency, throughput and RSS
+growth per session over the reruns after it (so import and warm-up costs
+aren't counted), and compare against the baselines in loadtest_baselines.json.
+Baselines are only compared with runs of the same sessions and iterations.
+"""
+import json
+import os
+import random
+import resource
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).parent
+BASELINES_PATH = ROOT / "loadtest_baselines.json"
+APPS = ["congress.py", "purine.py", "purineapp.py"]
+RERUN_TIMEOUT = 60
+# Allowed slowdown against the baseline before a metric counts as a regression
+TOLERANCE = 0.25
+
+BILL_TYPES = ["HR", "S", "HJRES", "SJRES"]
+PARTIES = ["D", "R", "I"]
+
+def fixture_bills(congress, chamber, count=50):
+    """Deterministic bill list for a congress/chamber"""
+    rng = random.Random(f"{congress}-{chamber}")
+    statuses = ["Introduced in House", "Read twice and referred", "Passed House", "Passed Senate",
+                "Became Public Law", "Failed of passage"]
+    bills = []
+    for i in range(count):
+        bill_type = rng.choice(BILL_TYPES)
+        number = f"{bill_type}{rng.randint(1, 9999)}"
+        bills.append({
+            "number": number,
+            "title": f"Fixture Act {i} of the {congress}th Congress relating to {chamber.lower()} business",
+            "congress": congress,
+            "introducedDate": f"{2019 + 2 * (congress - 116)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "latestAction": {"actionDate": "2022-06-01", "text": rng.choice(statuses)},
+            "type": bill_type,
+            "url": f"https://example.invalid/bill/{number}",
+            "sponsors": [{"name": f"Rep. Fixture {i}", "party": rng.choice(PARTIES)}],
+            "cosponsors": {"count": rng.randint(0, 120)},
+        })
+    return {"bills": bills}
+
+
+def fixture_bill_detail(path):
+    """Subjects, actions, votes or text versions for a single bill"""
+    rng = random.Random(path)
+    if path.endswith("/actions"):
+        return {"actions": [
+            {"actionDate": f"2022-0{i + 1}-1{i}", "text": f"Action {i}", "type": rng.choice(["IntroReferral", "Vote"]),
+             "actionChamber": rng.choice(["House", "Senate"])}
+            for i in range(6)
+        ]}
+    if path.endswith("/votes"):
+        votes = []
+        for i in range(rng.randint(1, 3)):
+            dem_yes, rep_yes = rng.randint(0, 220), rng.randint(0, 210)
+            votes.append({
+                "date": f"2022-0{i + 3}-15", "question": "On Passage", "result": rng.choice(["Passed", "Failed"]),
+                "total": {"yea": dem_yes + rep_yes, "no": 435 - dem_yes - rep_yes, "present": 0, "notVoting": 0},
+                "democratic": {"yea": dem_yes, "no": 220 - dem_yes},
+                "republican": {"yea": rep_yes, "no": 210 - rep_yes},
+                "chamber": "House", "rollNumber": rng.randint(1, 500),
+            })
+        return {"votes": votes}
+    if path.endswith("/text"):
+        return {"textVersions": [{"date": "2022-01-10", "type": "Introduced",
+                                  "formats": [{"url": "https://example.invalid/text"}]}]}
+    return {"bill": {"subjects": {"legislativeSubjects": [{"name": f"Subject {i}"} for i in range(rng.randint(1, 5))]}}}
+
+
+class CongressStandIn(BaseHTTPRequestHandler):
+    """Serves fixture responses for the Congress.gov endpoints congress.py calls"""
+
+    def do_GET(self):
+        parts = urlparse(self.path).path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "bill":
+            body = fixture_bills(int(parts[1]), parts[2])
+        elif len(parts) >= 4 and parts[0] == "bill":
+            body = fixture_bill_detail("/".join(parts))
+        else:
+            self.send_error(404)
+            return
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in():
+    """Start the fixture server on a free port; returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CongressStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # No /proc (macOS): fall back to the peak RSS, reported in bytes there
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def timed_run(at, latencies):
+    start = time.perf_counter()
+    at.run(timeout=RERUN_TIMEOUT)
+    latencies.append(time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+
+def congress_session(at, rng, iterations, latencies):
+    for _ in range(iterations):
+        sidebar = at.sidebar
+        widget(sidebar.selectbox, "Select Congress").select_index(rng.randrange(3))
+        widget(sidebar.radio, "Select Chamber").set_value(rng.choice(["House", "Senate"]))
+        widget(sidebar.radio, "Sponsor Party").set_value(rng.choice(["All", "Democrats", "Republicans"]))
+        sidebar.button[0].click()
+        timed_run(at, latencies)
+        # Pick bills in the detail and voting tabs; the app only keeps bills
+        # for the run where "Load Bills" was clicked, so click it again
+        for label in ("Select a bill for detailed information", "Select a bill to analyze votes"):
+            boxes = [w for w in at.selectbox if w.label == label]
+            if boxes and boxes[0].options:
+                boxes[0].select_index(rng.randrange(len(boxes[0].options)))
+                at.sidebar.button[0].click()
+                timed_run(at, latencies)
+
+
+def purine_session(at, rng, iterations, latencies):
+    for _ in range(iterations):
+        for key in ("cat1", "cat2"):
+            category = at.selectbox(key=key)
+            category.select_index(rng.randrange(len(category.options)))
+            timed_run(at, latencies)
+        for key in ("food1", "food2"):
+            food = at.selectbox(key=key)
+            food.select_index(rng.randrange(len(food.options)))
+        timed_run(at, latencies)
+
+
+def purineapp_session(at, rng, iterations, latencies):
+    choices = [["Animal-based", "Plant-based"], ["Animal-based"], ["Plant-based"]]
+    for _ in range(iterations):
+        at.sidebar.multiselect[0].set_value(rng.choice(choices))
+        timed_run(at, latencies)
+
+
+SESSIONS = {
+    "congress.py": congress_session,
+    "purine.py": purine_session,
+    "purineapp.py": purineapp_session,
+}
+
+
+def run_session(app, seed, iterations, barrier=None):
+    """One session in its own process; returns its cold render, warm latencies, run window and RSS growth"""
+    cold, latencies = [], []
+    at = AppTest.from_file(str(ROOT / app), default_timeout=RERUN_TIMEOUT)
+    if barrier is not None:
+        # Start every session's first render together, once they've all imported
+        barrier.wait()
+    timed_run(at, cold)
+    start = time.time()
+    rss_warm = current_rss()
+    SESSIONS[app](at, random.Random(seed), iterations, latencies)
+    return {"cold_render": cold[0], "latencies": latencies, "start": start, "end": time.time(),
+            "rss_growth": current_rss() - rss_warm}
+
+
+def load_test(app, sessions=10, iterations=5):
+    """Run `sessions` concurrent sessions against one app and summarise them"""
+    with Manager() as manager, ProcessPoolExecutor(max_workers=sessions) as pool:
+        barrier = manager.Barrier(sessions)
+        futures = [pool.submit(run_session, app, seed, iterations, barrier) for seed in range(sessions)]
+        results = [future.result() for future in futures]
+    elapsed = max(result["end"] for result in results) - min(result["start"] for result in results)
+    latencies = np.array([latency for result in results for latency in result["latencies"]])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    cold_render = np.median([result["cold_render"] for result in results]) * 1000
+    return {
+        "sessions": sessions,
+        "iterations": iterations,
+        "reruns": int(len(latencies)),
+        "cold_render_ms": round(float(cold_render), 1),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "reruns_per_s": round(len(latencies) / elapsed, 2),
+        "rss_growth_mb_per_session": round(float(np.mean([result["rss_growth"] for result in results])) / 2**20, 2),
+    }
+
+
+def compare(results, baselines, tolerance=TOLERANCE):
+    """Metrics that got worse than their baseline by more than `tolerance`.
+
+    Returns (regressions, skipped): apps whose baseline was recorded with
+    different sessions or iterations aren't comparable and are only listed in
+    `skipped`.
+    """
+    regressions, skipped = [], []
+    for app, metrics in results.items():
+        baseline = baselines.get(app)
+        if not baseline:
+            continue
+        if any(baseline.get(key) != metrics[key] for key in ("sessions", "iterations")):
+            skipped.append(
+                f"{app}: baseline ran {baseline.get('sessions')} sessions x {baseline.get('iterations')} iterations, "
+                f"this run {metrics['sessions']} x {metrics['iterations']}"
+            )
+            continue
+        for name in ("cold_render_ms", "p50_ms", "p95_ms", "p99_ms", "rss_growth_mb_per_session"):
+            if name in baseline and metrics[name] > baseline[name] * (1 + tolerance):
+                regressions.append(f"{app} {name}: {metrics[name]} vs baseline {baseline[name]}")
+        if "reruns_per_s" in baseline and metrics["reruns_per_s"] < baseline["reruns_per_s"] * (1 - tolerance):
+            regressions.append(f"{app} reruns_per_s: {metrics['reruns_per_s']} vs baseline {baseline['reruns_per_s']}")
+    return regressions, skipped
+
+
+def run(apps=None, sessions=10, iterations=5, save_baseline=False, baselines_path=BASELINES_PATH):
+    """Load-test each app; returns (results, regressions, skipped comparisons)"""
+    server, base_url = start_stand_in()
+    os.environ["CONGRESS_API_URL"] = base_url
+    try:
+        results = {app: load_test(app, sessions, iterations) for app in apps or APPS}
+    finally:
+        server.shutdown()
+
+    baselines_path = Path(baselines_path)
+    baselines = json.loads(baselines_path.read_text()) if baselines_path.exists() else {}
+    regressions, skipped = compare(results, baselines)
+    if save_baseline:
+        baselines.update(results)
+        baselines_path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+    return results, regressions, skipped
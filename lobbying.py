@@ -0,0 +1,143 @@
+"""Foreign-lobbying spending surface for the 3D map.
+
+The surface is interpolated with `RBFInterpolator` on the unit sphere, so
+distances wrap around the antimeridian. A Gaussian kernel keeps the surface
+decaying to zero away from the countries, and each country is smoothed in
+proportion to how crowded its neighbourhood is, so isolated countries keep
+their exact peak while clusters of small neighbours with very different
+values don't make the surface ring. The solve is only neighbour-limited beyond
+a few hundred countries, so the usual ~200 have no seams where neighbour sets
+switch. The
+lon/lat grid is evaluated in chunks and each surface is cached on disk by data
+hash and interpolation settings.
+"""
+import hashlib
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.interpolate import RBFInterpolator
+from scipy.spatial import cKDTree
+
+CENTROIDS_PATH = Path(__file__).parent / "data" / "country_centroids.csv"
+SURFACE_CACHE_DIR = Path(__file__).parent / "data" / "cache" / "surfaces"
+
+# Grid points evaluated per RBFInterpolator call
+CHUNK_SIZE = 65536
+# Countries solved together before switching to a neighbour-limited solve
+NEIGHBORS = 500
+# Overshoot (as a share of the data range) beyond which the surface is reported
+OVERSHOOT_TOLERANCE = 0.1
+# Kernels that are positive definite on their own, so they need no polynomial
+# term and decay to zero far from the data, as functions of epsilon * distance
+DECAYING_KERNELS = {
+    'gaussian': lambda r: np.exp(-r ** 2),
+    'inverse_multiquadric': lambda r: 1 / np.sqrt(1 + r ** 2),
+    'inverse_quadratic': lambda r: 1 / (1 + r ** 2),
+}
+
+
+def load_centroids(path=CENTROIDS_PATH):
+    """Representative lat/lon for each country, keyed by ISO3 code"""
+    return pd.read_csv(path, index_col='iso_alpha')
+
+
+def to_unit_vectors(lon, lat):
+    """Lon/lat in degrees to points on the unit sphere"""
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def lonlat_grid(resolution=100):
+    """Mesh with `resolution` latitudes and twice as many longitudes, equally spaced in degrees"""
+    lon_range = np.linspace(-180, 180, 2 * resolution)
+    lat_range = np.linspace(-90, 90, resolution)
+    return np.meshgrid(lon_range, lat_range)
+
+
+def surface_key(lon, lat, values, kernel, epsilon, smoothing, resolution, neighbors):
+    """Cache key for a surface: hash of the input points plus interpolation settings"""
+    digest = hashlib.sha256()
+    for array in (lon, lat, values):
+        digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    digest.update(f"{kernel}|{epsilon}|{smoothing}|{resolution}|{neighbors}".encode())
+    return digest.hexdigest()[:32]
+
+
+def crowding(points, kernel, shape):
+    """How much each point's kernel overlaps the others', summed within three kernel widths"""
+    tree = cKDTree(points)
+    distances = tree.sparse_distance_matrix(tree, max_distance=3 / shape, output_type='coo_matrix')
+    overlap = DECAYING_KERNELS[kernel](shape * distances.data)
+    # The matrix includes each point's zero distance to itself
+    return np.bincount(distances.row, weights=overlap, minlength=len(points)) - 1
+
+
+def check_bounds(surface, values, tolerance=OVERSHOOT_TOLERANCE):
+    """Warn if the surface strays well outside the range of the data"""
+    lo, hi = min(values.min(), 0), values.max()
+    slack = tolerance * (hi - lo)
+    if surface.min() < lo - slack or surface.max() > hi + slack:
+        warnings.warn(
+            f"Interpolated surface spans [{surface.min():.1f}, {surface.max():.1f}] for data in "
+            f"[{lo:.1f}, {hi:.1f}]; it will be clipped. Increase `smoothing` or narrow `epsilon`.",
+            stacklevel=3,
+        )
+
+
+def interpolate_surface(lon, lat, values, kernel='gaussian', epsilon=10, smoothing=1.0, resolution=100,
+                        neighbors=NEIGHBORS, chunk_size=CHUNK_SIZE):
+    """Interpolate point values onto a lon/lat grid.
+
+    `epsilon` is the kernel width in degrees, like the legacy `Rbf` call
+    (`sqrt((r/15)**2 + 1)` with r in degrees); it is converted to the
+    shape parameter `RBFInterpolator` expects for distances on the unit sphere.
+    For decaying kernels `smoothing` is relative: each country is smoothed by
+    `smoothing` times its kernel overlap with its neighbours, so it adapts to
+    how densely countries are packed. The interpolant is linear in `values`,
+    so the result doesn't depend on their units.
+    """
+    points = to_unit_vectors(lon, lat)
+    values = np.asarray(values, dtype=np.float64)
+    neighbors = None if neighbors is None or neighbors >= len(values) else neighbors
+    shape = np.degrees(1) / epsilon
+    if kernel in DECAYING_KERNELS:
+        smoothing = smoothing * crowding(points, kernel, shape)
+    rbf = RBFInterpolator(
+        points, values,
+        kernel=kernel,
+        epsilon=shape,
+        smoothing=smoothing,
+        neighbors=neighbors,
+        degree=-1 if kernel in DECAYING_KERNELS else None,
+    )
+
+    lon_grid, lat_grid = lonlat_grid(resolution)
+    grid_points = to_unit_vectors(lon_grid.ravel(), lat_grid.ravel())
+    surface = np.empty(len(grid_points))
+    for start in range(0, len(grid_points), chunk_size):
+        surface[start:start + chunk_size] = rbf(grid_points[start:start + chunk_size])
+    check_bounds(surface, values)
+    return lon_grid, lat_grid, surface.reshape(lon_grid.shape)
+
+
+def spending_surface(lon, lat, values, kernel='gaussian', epsilon=10, smoothing=1.0, resolution=100,
+                     neighbors=NEIGHBORS, cache_dir=SURFACE_CACHE_DIR):
+    """Cached, non-negative interpolated surface; returns (lon_grid, lat_grid, z)"""
+    key = surface_key(lon, lat, values, kernel, epsilon, smoothing, resolution, neighbors)
+    path = Path(cache_dir) / f"{key}.npy"
+    if path.exists():
+        lon_grid, lat_grid = lonlat_grid(resolution)
+        return lon_grid, lat_grid, np.load(path)
+
+    lon_grid, lat_grid, surface = interpolate_surface(
+        lon, lat, values, kernel=kernel, epsilon=epsilon, smoothing=smoothing,
+        resolution=resolution, neighbors=neighbors
+    )
+    # Heights stay within the data and the elevation model never goes negative
+    surface = np.clip(surface, 0, np.max(values))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.save(path, surface)
+    return lon_grid, lat_grid, surface
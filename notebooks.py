@@ -0,0 +1,283 @@
+"""Headless notebook refresh with per-cell output caching.
+
+Every code cell gets a key hashing its source, the key of the cell above it
+and the content of the local modules it imports (followed transitively, so
+editing store.py reaches cells that import schema). The first cell's key also
+covers the notebook's data files, declared in NOTEBOOK_INPUTS, so a change
+anywhere upstream invalidates everything below it. Outputs are cached under
+data/cache/notebooks by key, together with a pickled snapshot of the kernel
+namespace after the cell:
+
+* if every cell's key is cached the notebook is refreshed from the cache and
+  no kernel is started;
+* otherwise a kernel restores the snapshot of the last cached cell above the
+  first changed one and only runs from there. When there is no usable
+  snapshot (some variable couldn't be pickled) the cached cells above are run
+  again to rebuild the state, and are counted as executed.
+
+Notebooks run in parallel, one kernel per worker process.
+"""
+import ast
+import hashlib
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import nbformat
+from jupyter_client.manager import start_new_kernel
+
+from store import DATASETS, build, file_hash
+
+ROOT = Path(__file__).parent
+DATA_DIR = ROOT / "data"
+CACHE_DIR = DATA_DIR / "cache" / "notebooks"
+NOTEBOOKS = ["birdflu.ipynb", "purine.ipynb", "foreignLobbying.ipynb"]
+CELL_TIMEOUT = 600
+
+# Data files (globs under data/) each notebook reads, directly or through the
+# local modules it imports. Notebooks not listed depend on every data file.
+NOTEBOOK_INPUTS = {
+    "birdflu.ipynb": ["birdflu.csv", "geo/counties_z*.geojson"],
+    "purine.ipynb": ["purine.csv"],
+    "foreignLobbying.ipynb": ["fara_spending.parquet", "fara_seed.csv", "country_centroids.csv"],
+}
+
+DATA_FILE_PATTERN = re.compile(r"""['"](data/[^'"]+)['"]""")
+DATASET_PATTERN = re.compile(r"""load_dataset\(\s*['"](\w+)['"]""")
+IMPORT_PATTERN = re.compile(r"^\s*(?:from|import)\s+(\w+)", re.MULTILINE)
+
+# Defined in the kernel to snapshot and restore the user namespace. Names
+# defined in the notebook itself (functions, classes) pickle by reference and
+# can't be restored in a fresh kernel, so they make the snapshot unusable.
+STATE_HELPERS = """
+def _datebooks_save_state(path):
+    import os, pickle, types
+    ip = get_ipython()
+    modules, state = {}, {}
+    for name, value in list(ip.user_ns.items()):
+        if name.startswith('_') or name in ip.user_ns_hidden:
+            continue
+        if isinstance(value, types.ModuleType):
+            modules[name] = value.__name__
+            continue
+        if getattr(value, '__module__', None) == '__main__' or type(value).__module__ == '__main__':
+            return False
+        try:
+            state[name] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump({'modules': modules, 'state': state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+    return True
+
+def _datebooks_load_state(path):
+    import importlib, pickle
+    ns = get_ipython().user_ns
+    with open(path, 'rb') as f:
+        snapshot = pickle.load(f)
+    for name, module in snapshot['modules'].items():
+        ns[name] = importlib.import_module(module)
+    for name, value in snapshot['state'].items():
+        ns[name] = pickle.loads(value)
+"""
+
+
+def module_imports(path):
+    """Top-level module names a Python file imports"""
+    try:
+        tree = ast.parse(Path(path).read_text())
+    except SyntaxError:
+        return set(IMPORT_PATTERN.findall(Path(path).read_text()))
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    return names
+
+
+def local_modules(names, root=ROOT):
+    """Local module files for `names`, plus every local module they import in turn"""
+    found = set()
+    pending = [root / f"{name}.py" for name in names]
+    while pending:
+        path = pending.pop()
+        if path in found or not path.is_file():
+            continue
+        found.add(path)
+        pending.extend(root / f"{name}.py" for name in module_imports(path))
+    return found
+
+
+def notebook_inputs(path, root=ROOT):
+    """Data files a notebook depends on"""
+    data_dir = root / "data"
+    patterns = NOTEBOOK_INPUTS.get(Path(path).name)
+    if patterns is None:
+        derived = {data_dir / "cache", data_dir / "store"}
+        return sorted(p for p in data_dir.rglob("*") if p.is_file() and not derived & set(p.parents))
+    return sorted(p for pattern in patterns for p in data_dir.glob(pattern) if p.is_file())
+
+
+def cell_inputs(source, root=ROOT):
+    """Data files and local modules (with their local imports) a cell's source refers to"""
+    paths = {root / match for match in DATA_FILE_PATTERN.findall(source)}
+    for name in DATASET_PATTERN.findall(source):
+        if name in DATASETS:
+            paths.update(root / "data" / path for path in DATASETS[name][0])
+    paths.update(local_modules(IMPORT_PATTERN.findall(source), root))
+    return sorted(path for path in paths if path.is_file())
+
+
+def cell_keys(nb, root=ROOT, inputs=()):
+    """Cache key for each code cell, chained through the cells above it.
+
+    `inputs` (the notebook's data files) are hashed into the chain ahead of the
+    first cell, so they invalidate every cell.
+    """
+    seed = hashlib.sha256()
+    for path in inputs:
+        seed.update(f"{path.relative_to(root)}:{file_hash(path)}".encode())
+    keys = []
+    previous = seed.hexdigest()
+    for cell in nb.cells:
+        if cell.cell_type != "code":
+            keys.append(None)
+            continue
+        digest = hashlib.sha256(previous.encode())
+        digest.update(cell.source.encode())
+        for path in cell_inputs(cell.source, root):
+            digest.update(f"{path.relative_to(root)}:{file_hash(path)}".encode())
+        previous = digest.hexdigest()
+        keys.append(previous)
+    return keys
+
+
+def read_cached(key, cache_dir=CACHE_DIR):
+    path = Path(cache_dir) / f"{key}.json"
+    if path.exists():
+        return json.loads(path.read_text())
+    return None
+
+
+def write_cached(key, outputs, execution_count, cache_dir=CACHE_DIR):
+    path = Path(cache_dir) / f"{key}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"outputs": outputs, "execution_count": execution_count}))
+
+
+def state_path(key, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / f"{key}.state.pkl"
+
+
+def execute_cell(kc, source, timeout=CELL_TIMEOUT, store_history=True):
+    """Run one cell in the kernel; returns (outputs, execution_count, error)"""
+    msg_id = kc.execute(source, store_history=store_history)
+    outputs = []
+    execution_count = None
+    error = None
+    while True:
+        msg = kc.get_iopub_msg(timeout=timeout)
+        if msg["parent_header"].get("msg_id") != msg_id:
+            continue
+        msg_type = msg["msg_type"]
+        content = msg["content"]
+        if msg_type == "status" and content["execution_state"] == "idle":
+            break
+        if msg_type == "execute_input":
+            execution_count = content.get("execution_count")
+        elif msg_type == "clear_output":
+            outputs = []
+        elif msg_type in ("stream", "display_data", "execute_result", "error"):
+            outputs.append(nbformat.v4.output_from_msg(msg))
+            if msg_type == "error":
+                error = f"{content['ename']}: {content['evalue']}"
+    return outputs, execution_count, error
+
+
+def save_state(kc, key, cache_dir=CACHE_DIR, timeout=CELL_TIMEOUT):
+    """Snapshot the kernel namespace for a cell's key; False if it can't be pickled"""
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    path = str(state_path(key, cache_dir))
+    outputs, _, error = execute_cell(kc, f"_datebooks_save_state({path!r})", timeout, store_history=False)
+    return error is None and any(output.get("data", {}).get("text/plain") == "True" for output in outputs)
+
+
+def restore_state(kc, key, cache_dir=CACHE_DIR, timeout=CELL_TIMEOUT):
+    """Load a namespace snapshot into the kernel; False if there is none or it fails"""
+    path = state_path(key, cache_dir)
+    if not path.exists():
+        return False
+    _, _, error = execute_cell(kc, f"_datebooks_load_state({str(path)!r})", timeout, store_history=False)
+    return error is None
+
+
+def run_notebook(path, cache_dir=CACHE_DIR, timeout=CELL_TIMEOUT, build_store=True):
+    """Refresh a notebook's outputs in place; returns a short summary dict.
+
+    Stale store datasets are rebuilt first (unless `build_store` is False
+    because the caller already did), since cells read the store rather than
+    the raw files their keys hash. `executed` counts the cells that actually
+    ran in a kernel and `cached` the code cells whose outputs came from the
+    cache without running.
+    """
+    if build_store:
+        build()
+    path = Path(path)
+    nb = nbformat.read(path, as_version=4)
+    keys = cell_keys(nb, path.parent, notebook_inputs(path, path.parent))
+    cached = [read_cached(key, cache_dir) if key else None for key in keys]
+    misses = [i for i, key in enumerate(keys) if key and cached[i] is None]
+    executed = set()
+    summary = {"notebook": path.name, "executed": 0, "cached": 0, "error": None}
+
+    if misses:
+        km, kc = start_new_kernel(kernel_name=nb.metadata.get("kernelspec", {}).get("name", "python3"),
+                                  cwd=str(path.parent))
+        try:
+            execute_cell(kc, STATE_HELPERS, timeout, store_history=False)
+            # Resume from the snapshot of the last cached cell above the first miss
+            start = 0
+            above = [i for i in range(misses[0]) if keys[i]]
+            if above and restore_state(kc, keys[above[-1]], cache_dir, timeout):
+                start = misses[0]
+            for i, cell in enumerate(nb.cells[:misses[-1] + 1]):
+                if i < start or keys[i] is None:
+                    continue
+                outputs, execution_count, error = execute_cell(kc, cell.source, timeout)
+                executed.add(i)
+                if error:
+                    # Keep what ran so far; the failing cell isn't cached
+                    cell.outputs, cell.execution_count = outputs, execution_count
+                    summary["error"] = f"cell {i}: {error}"
+                    break
+                if cached[i] is None:
+                    write_cached(keys[i], outputs, execution_count, cache_dir)
+                    cached[i] = {"outputs": outputs, "execution_count": execution_count}
+                if not state_path(keys[i], cache_dir).exists():
+                    save_state(kc, keys[i], cache_dir, timeout)
+        finally:
+            kc.stop_channels()
+            km.shutdown_kernel(now=True)
+
+    for i, cell in enumerate(nb.cells):
+        if cached[i] is not None:
+            cell.outputs = [nbformat.from_dict(output) for output in cached[i]["outputs"]]
+            cell.execution_count = cached[i]["execution_count"]
+    summary["executed"] = len(executed)
+    summary["cached"] = sum(1 for i, entry in enumerate(cached) if entry is not None and i not in executed)
+    nbformat.write(nb, path)
+    return summary
+
+
+def run_notebooks(paths=None, workers=None, cache_dir=CACHE_DIR):
+    """Refresh several notebooks in parallel"""
+    paths = [Path(p) for p in paths] if paths else [ROOT / name for name in NOTEBOOKS]
+    # Bring the store up to date once, before any kernel reads from it
+    build()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_notebook, path, cache_dir, build_store=False) for path in paths]
+        return [future.result() for future in futures]
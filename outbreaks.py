@@ -0,0 +1,463 @@
+"""Bird-flu outbreak data with incrementally maintained aggregates.
+
+`OutbreakAggregates` keeps running per-state, per-county and per-flock-type
+totals (flock size sum/count/mean, outbreak sum and a flock size quantile
+sketch). New USDA rows are folded in with `append`, which only touches the new
+rows, and the state is persisted to data/cache together with the size and
+mtime of the CSV it describes and a hash of every row it has seen, so appends
+skip duplicates and nothing is recomputed from the full history unless the
+CSV is changed by something else.
+
+`OutbreakCube` bins outbreaks into a dense location x week x flock type array
+with prefix sums along the week axis, for O(1) date-range totals and
+vectorised animation frames. `FlockTypeIndex` turns the semicolon-joined
+`Flock Type` column into row bitsets for fast multi-label filtering.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_PATH = Path(__file__).parent / "data" / "birdflu.csv"
+AGGREGATES_PATH = Path(__file__).parent / "data" / "cache" / "outbreak_aggregates.npz"
+
+# Quantile sketch: fixed-width bins over log1p(flock size). 0.05 wide bins
+# keep quantiles within ~2.5% of the exact value, up to flocks of e^20.
+SKETCH_BIN_WIDTH = 0.05
+SKETCH_BINS = 400
+
+RAW_COLUMNS = ('FullGeoName', 'FIPS Codes', 'County Name', 'State', 'Outbreak Date', 'Flock Type',
+               'Flock Size', 'State Count', 'Outbreaks', 'Counties')
+
+# Dimension name -> column holding its key
+DIMENSIONS = {
+    "State": "State",
+    "County": "FIPS Codes",
+    "Flock Type": "Flock Type",
+}
+
+
+def clean_outbreaks(df):
+    """Normalise a raw bird-flu frame the way the notebook expects it"""
+    df = df.copy()
+    df['FIPS Codes'] = df['FIPS Codes'].astype(str).str.zfill(5)
+    df['Flock Size'] = pd.to_numeric(df['Flock Size'], errors='coerce').fillna(0)
+    df['Outbreaks'] = pd.to_numeric(df['Outbreaks'], errors='coerce').fillna(0)
+    # log1p handles zero values
+    df['Log_Flock_Size'] = np.log1p(df['Flock Size'])
+    if not pd.api.types.is_datetime64_any_dtype(df['Outbreak Date']):
+        df['Outbreak Date'] = pd.to_datetime(df['Outbreak Date'], format='%m/%d/%Y', errors='coerce')
+    return df
+
+
+def load_outbreaks(path=DATA_PATH):
+    """Read and clean the bird-flu CSV"""
+    return clean_outbreaks(pd.read_csv(path))
+
+
+def csv_version(path=DATA_PATH):
+    """(size, mtime) of the outbreak CSV, to tell whether saved aggregates still describe it"""
+    stat = Path(path).stat()
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def row_keys(df):
+    """Hash per outbreak row, comparable between raw and cleaned frames"""
+    df = clean_outbreaks(df)
+    return pd.util.hash_pandas_object(df[list(RAW_COLUMNS)].astype(str), index=False).to_numpy()
+
+
+def split_flock_types(values):
+    """Split the semicolon-joined `Flock Type` values into one entry per type"""
+    return values.astype('string').fillna('').str.split(';').apply(
+        lambda parts: [part.strip() for part in parts if part.strip()]
+    )
+
+
+class FlockTypeIndex:
+    """Multi-label `Flock Type` membership as a vocabulary plus row bitsets.
+
+    Each row gets one bit per flock type, packed into uint64 words, so
+    "any of" / "all of" / "none of" filters are a couple of vectorised bit
+    operations instead of `str.contains` scans.
+    """
+
+    def __init__(self, values, vocabulary=None):
+        types = split_flock_types(pd.Series(values))
+        if vocabulary is None:
+            vocabulary = sorted({t for row in types for t in row})
+        self.vocabulary = pd.Index(vocabulary, name='Flock Type')
+        position = {t: i for i, t in enumerate(self.vocabulary)}
+
+        counts = types.str.len().to_numpy()
+        rows = np.repeat(np.arange(len(types)), counts)
+        labels = np.fromiter((position.get(t, -1) for row in types for t in row), dtype=np.int64, count=int(counts.sum()))
+        # Types outside a fixed vocabulary are dropped
+        rows, labels = rows[labels >= 0], labels[labels >= 0]
+
+        self.bits = np.zeros((len(types), max((len(self.vocabulary) + 63) // 64, 1)), dtype=np.uint64)
+        np.bitwise_or.at(self.bits, (rows, labels // 64), np.left_shift(np.uint64(1), (labels % 64).astype(np.uint64)))
+
+    def __len__(self):
+        return len(self.bits)
+
+    def mask(self, flock_types):
+        """Bit mask (one row of words) selecting the given flock types.
+
+        Types that aren't in the vocabulary have no bit and are ignored.
+        """
+        if isinstance(flock_types, str):
+            flock_types = [flock_types]
+        words = np.zeros(self.bits.shape[1], dtype=np.uint64)
+        for flock_type in flock_types:
+            if flock_type not in self.vocabulary:
+                continue
+            i = self.vocabulary.get_loc(flock_type)
+            words[i // 64] |= np.uint64(1) << np.uint64(i % 64)
+        return words
+
+    def any_of(self, flock_types):
+        """Rows listing at least one of the flock types"""
+        return (self.bits & self.mask(flock_types)).any(axis=1)
+
+    def all_of(self, flock_types):
+        """Rows listing every one of the flock types"""
+        if isinstance(flock_types, str):
+            flock_types = [flock_types]
+        if any(flock_type not in self.vocabulary for flock_type in flock_types):
+            # No row lists a type that isn't indexed
+            return np.zeros(len(self), dtype=bool)
+        mask = self.mask(flock_types)
+        return ((self.bits & mask) == mask).all(axis=1)
+
+    def none_of(self, flock_types):
+        """Rows listing none of the flock types"""
+        return ~self.any_of(flock_types)
+
+    def membership(self):
+        """Dense rows x flock types boolean matrix"""
+        columns = np.arange(len(self.vocabulary))
+        words = self.bits[:, columns // 64]
+        return (words >> (columns % 64).astype(np.uint64)) & np.uint64(1) == 1
+
+    def pairs(self):
+        """(row, flock type) index arrays, one entry per listed type"""
+        return np.nonzero(self.membership())
+
+    def aggregate(self, values):
+        """Per-flock-type sum and count of `values`"""
+        membership = self.membership()
+        values = np.asarray(values, dtype=np.float64)
+        return pd.DataFrame({
+            'sum': values @ membership,
+            'count': membership.sum(axis=0),
+        }, index=self.vocabulary)
+
+
+def sketch_bins(log_flock_size):
+    """Sketch bin index for log1p flock sizes"""
+    bins = np.floor(np.asarray(log_flock_size, dtype=float) / SKETCH_BIN_WIDTH).astype(np.int64)
+    return np.clip(bins, 0, SKETCH_BINS - 1)
+
+
+def sketch_quantiles(counts, qs):
+    """Approximate flock size quantiles from one row of sketch bin counts"""
+    total = counts.sum()
+    if total == 0:
+        return np.full(len(qs), np.nan)
+    cumulative = np.cumsum(counts)
+    # Same rank convention as np.quantile's default (linear) at bin resolution
+    ranks = np.asarray(qs, dtype=float) * (total - 1)
+    bins = np.searchsorted(cumulative, ranks, side='right')
+    log_values = (bins + 0.5) * SKETCH_BIN_WIDTH
+    return np.expm1(log_values)
+
+
+class DimensionAggregate:
+    """Running totals for one grouping dimension (e.g. per state)"""
+
+    def __init__(self, keys=None, flock_sum=None, count=None, outbreaks=None, sketch=None):
+        self.keys = list(keys) if keys is not None else []
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.flock_sum = np.asarray(flock_sum if flock_sum is not None else [], dtype=np.float64)
+        self.count = np.asarray(count if count is not None else [], dtype=np.int64)
+        self.outbreaks = np.asarray(outbreaks if outbreaks is not None else [], dtype=np.int64)
+        self.sketch = np.asarray(sketch if sketch is not None else np.zeros((0, SKETCH_BINS)), dtype=np.int64)
+
+    def _grow(self, keys):
+        """Make room for keys that have not been seen before"""
+        new_keys = [key for key in dict.fromkeys(keys) if key not in self.index]
+        if not new_keys:
+            return
+        for key in new_keys:
+            self.index[key] = len(self.keys)
+            self.keys.append(key)
+        extra = len(new_keys)
+        self.flock_sum = np.concatenate([self.flock_sum, np.zeros(extra)])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self.outbreaks = np.concatenate([self.outbreaks, np.zeros(extra, dtype=np.int64)])
+        self.sketch = np.vstack([self.sketch, np.zeros((extra, SKETCH_BINS), dtype=np.int64)])
+
+    def add(self, keys, flock_size, outbreaks, log_flock_size):
+        """Fold new rows into the running totals"""
+        keys = list(keys)
+        if not keys:
+            return
+        self._grow(keys)
+        rows = np.fromiter((self.index[key] for key in keys), dtype=np.int64, count=len(keys))
+        np.add.at(self.flock_sum, rows, np.asarray(flock_size, dtype=np.float64))
+        np.add.at(self.count, rows, 1)
+        np.add.at(self.outbreaks, rows, np.asarray(outbreaks, dtype=np.int64))
+        np.add.at(self.sketch, (rows, sketch_bins(log_flock_size)), 1)
+
+    def summary(self):
+        """Per-key totals as a DataFrame"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.flock_sum / self.count
+        return pd.DataFrame({
+            'Total Flock Size': self.flock_sum,
+            'Average Flock Size': mean,
+            'Number of Cases': self.count,
+            'Total Outbreaks': self.outbreaks,
+        }, index=pd.Index(self.keys))
+
+    def quantiles(self, qs):
+        """Approximate flock size quantiles per key"""
+        return pd.DataFrame(
+            [sketch_quantiles(counts, qs) for counts in self.sketch],
+            index=pd.Index(self.keys),
+            columns=list(qs),
+        )
+
+
+class OutbreakAggregates:
+    """Incrementally maintained outbreak aggregates for every dimension"""
+
+    def __init__(self, dimensions=None, overall_sketch=None, source=None, row_keys=None):
+        self.dimensions = dimensions or {name: DimensionAggregate() for name in DIMENSIONS}
+        self.overall_sketch = np.asarray(
+            overall_sketch if overall_sketch is not None else np.zeros(SKETCH_BINS), dtype=np.int64
+        )
+        # (size, mtime) of the CSV these totals were computed from
+        self.source = source
+        # Sorted hashes of every row folded in, for de-duplicating appends
+        self.row_keys = np.asarray(row_keys if row_keys is not None else [], dtype=np.uint64)
+
+    @classmethod
+    def from_frame(cls, df):
+        aggregates = cls()
+        aggregates.append(df)
+        return aggregates
+
+    @property
+    def rows(self):
+        return int(self.overall_sketch.sum())
+
+    def append(self, new_rows):
+        """Fold new outbreak rows in; cost is proportional to len(new_rows)"""
+        df = new_rows if 'Log_Flock_Size' in new_rows.columns else clean_outbreaks(new_rows)
+        if df.empty:
+            return self
+        for name, column in DIMENSIONS.items():
+            if name == "Flock Type":
+                # A row counts once towards every flock type it lists
+                flock_types = FlockTypeIndex(df[column])
+                rows, types = flock_types.pairs()
+                keys = flock_types.vocabulary[types]
+            else:
+                rows = np.arange(len(df))
+                keys = df[column].astype(str)
+            self.dimensions[name].add(
+                keys,
+                df['Flock Size'].to_numpy()[rows],
+                df['Outbreaks'].to_numpy()[rows],
+                df['Log_Flock_Size'].to_numpy()[rows],
+            )
+        np.add.at(self.overall_sketch, sketch_bins(df['Log_Flock_Size'].to_numpy()), 1)
+        self.row_keys = np.union1d(self.row_keys, row_keys(df))
+        return self
+
+    def is_new(self, rows):
+        """Mask of the rows not folded in yet (counting repeats within `rows` once)"""
+        keys = row_keys(rows)
+        seen = np.isin(keys, self.row_keys)
+        return ~seen & ~pd.Series(keys).duplicated().to_numpy()
+
+    def summary(self, dimension="State"):
+        """Summary table matching the notebook's state groupby, sorted by total flock size"""
+        return self.dimensions[dimension].summary().round(2).sort_values('Total Flock Size', ascending=False)
+
+    def quantiles(self, qs=(0, 0.2, 0.4, 0.6, 0.8, 1), dimension=None):
+        """Approximate flock size quantiles, overall or per key of a dimension"""
+        if dimension is None:
+            return sketch_quantiles(self.overall_sketch, qs)
+        return self.dimensions[dimension].quantiles(qs)
+
+    def save(self, path=AGGREGATES_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {'overall_sketch': self.overall_sketch}
+        for i, (name, dim) in enumerate(self.dimensions.items()):
+            arrays[f'{i}_keys'] = np.asarray(dim.keys, dtype=str)
+            arrays[f'{i}_flock_sum'] = dim.flock_sum
+            arrays[f'{i}_count'] = dim.count
+            arrays[f'{i}_outbreaks'] = dim.outbreaks
+            arrays[f'{i}_sketch'] = dim.sketch
+        arrays['dimensions'] = np.asarray(list(self.dimensions), dtype=str)
+        arrays['source'] = np.asarray(self.source or (-1, -1), dtype=np.int64)
+        arrays['row_keys'] = self.row_keys
+        # Write then rename so a crash never leaves a half-written state file
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path=AGGREGATES_PATH):
+        with np.load(path) as data:
+            dimensions = {}
+            for i, name in enumerate(data['dimensions'].tolist()):
+                dimensions[name] = DimensionAggregate(
+                    keys=data[f'{i}_keys'].tolist(),
+                    flock_sum=data[f'{i}_flock_sum'],
+                    count=data[f'{i}_count'],
+                    outbreaks=data[f'{i}_outbreaks'],
+                    sketch=data[f'{i}_sketch'],
+                )
+            source = None
+            if 'source' in data.files and data['source'].shape == (2,):
+                source = tuple(data['source'].tolist())
+            row_keys = data['row_keys'] if 'row_keys' in data.files else None
+            return cls(dimensions, data['overall_sketch'], source, row_keys)
+
+
+def load_aggregates(path=AGGREGATES_PATH, data_path=DATA_PATH):
+    """Persisted aggregates, rebuilt from the full CSV when it no longer matches them"""
+    source = csv_version(data_path)
+    if Path(path).exists():
+        aggregates = OutbreakAggregates.load(path)
+        if aggregates.source == source:
+            return aggregates
+    aggregates = OutbreakAggregates.from_frame(load_outbreaks(data_path))
+    aggregates.source = source
+    aggregates.save(path)
+    return aggregates
+
+
+def append_outbreaks(new_rows, path=AGGREGATES_PATH, data_path=DATA_PATH):
+    """Add a batch of new outbreak rows to the CSV and the persisted aggregates.
+
+    Work is proportional to the batch: rows already folded in (or repeated
+    within the batch) are skipped using the aggregates' row hashes, and the
+    new rows are appended to the CSV in place. The aggregates are saved with
+    the CSV's new size and mtime afterwards, so if the process dies in
+    between, the next `load_aggregates` sees the mismatch and rebuilds. The
+    store's birdflu dataset is rebuilt by its next reader, which notices the
+    CSV changed.
+    """
+    aggregates = load_aggregates(path, data_path)
+    new_rows = new_rows[aggregates.is_new(new_rows)]
+    if new_rows.empty:
+        return aggregates
+
+    raw = new_rows.reindex(columns=pd.read_csv(data_path, nrows=0).columns)
+    if pd.api.types.is_datetime64_any_dtype(raw['Outbreak Date']):
+        raw['Outbreak Date'] = raw['Outbreak Date'].dt.strftime('%m/%d/%Y')
+    with open(data_path, 'rb+') as f:
+        f.seek(0, 2)
+        # The USDA export has no trailing newline; don't glue the new rows onto it
+        if f.tell() > 0:
+            f.seek(-1, 2)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write(raw.to_csv(header=False, index=False).encode())
+
+    aggregates.append(new_rows)
+    aggregates.source = csv_version(data_path)
+    aggregates.save(path)
+    return aggregates
+
+
+class OutbreakCube:
+    """Dense location x week x flock type cube of one outbreak measure.
+
+    Prefix sums along the week axis make any date-range or rolling-window
+    total a single subtraction per cell. Rows listing several flock types
+    count towards each of them; `flock_type=None` queries use the per-row
+    totals, so nothing is double counted.
+    """
+
+    def __init__(self, df, level="State", measure="Flock Size"):
+        column = DIMENSIONS[level]
+        df = df if pd.api.types.is_datetime64_any_dtype(df['Outbreak Date']) else clean_outbreaks(df)
+        df = df[df['Outbreak Date'].notna()]
+        self.level = level
+        self.measure = measure
+
+        # Weeks start on Monday; every week between the first and last outbreak gets a slot
+        week_start = df['Outbreak Date'].dt.to_period('W-SUN').dt.start_time
+        if len(week_start):
+            first = week_start.min()
+            week = ((week_start - first).dt.days // 7).to_numpy()
+            self.weeks = pd.date_range(first, periods=int(week.max()) + 1, freq='7D')
+        else:
+            # Nothing dated (e.g. an empty slice): a cube with no weeks
+            week = np.zeros(0, dtype=np.int64)
+            self.weeks = pd.DatetimeIndex([])
+
+        location, locations = pd.factorize(df[column].astype(str), sort=True)
+        self.locations = pd.Index(locations, name=level)
+
+        flock_types = FlockTypeIndex(df['Flock Type'])
+        self.flock_types = flock_types.vocabulary
+        rows, type_index = flock_types.pairs()
+
+        values = df[measure].to_numpy(dtype=np.float64)
+        shape = (len(self.locations), len(self.weeks))
+        totals = np.zeros(shape)
+        np.add.at(totals, (location, week), values)
+        cube = np.zeros(shape + (len(self.flock_types),))
+        np.add.at(cube, (location[rows], week[rows], type_index), values[rows])
+
+        # prefix[:, w] holds the sum of weeks [0, w); the leading zero column
+        # lets every range be prefix[:, end] - prefix[:, start]
+        self.total_prefix = np.concatenate([np.zeros((shape[0], 1)), totals.cumsum(axis=1)], axis=1)
+        self.prefix = np.concatenate([np.zeros((shape[0], 1, len(self.flock_types))), cube.cumsum(axis=1)], axis=1)
+
+    def _prefix(self, flock_type):
+        if flock_type is None:
+            return self.total_prefix
+        return self.prefix[:, :, self.flock_types.get_loc(flock_type)]
+
+    def _week_position(self, date):
+        """Number of cube weeks that start on or before `date`"""
+        return int(self.weeks.searchsorted(pd.Timestamp(date), side='right'))
+
+    def range_total(self, start=None, end=None, flock_type=None):
+        """Total per location for outbreaks in the weeks covering [start, end]"""
+        prefix = self._prefix(flock_type)
+        lo = 0 if start is None else max(self._week_position(start) - 1, 0)
+        hi = len(self.weeks) if end is None else self._week_position(end)
+        return pd.Series(prefix[:, hi] - prefix[:, min(lo, hi)], index=self.locations, name=self.measure)
+
+    def rolling(self, window=4, flock_type=None):
+        """Trailing `window`-week totals, as a location x week frame"""
+        prefix = self._prefix(flock_type)
+        end = np.arange(1, len(self.weeks) + 1)
+        start = np.maximum(end - window, 0)
+        return pd.DataFrame(prefix[:, end] - prefix[:, start], index=self.locations, columns=self.weeks)
+
+    def frames(self, window=None, flock_type=None):
+        """Long frame (location, week, value) ready for an animated choropleth.
+
+        With `window=None` each frame shows the cumulative total up to that
+        week, otherwise the trailing `window`-week total.
+        """
+        if window is None:
+            wide = pd.DataFrame(self._prefix(flock_type)[:, 1:], index=self.locations, columns=self.weeks)
+        else:
+            wide = self.rolling(window, flock_type)
+        wide.columns.name = 'Week'
+        frames = wide.stack().rename(self.measure).reset_index()
+        frames['Week'] = frames['Week'].dt.strftime('%Y-%m-%d')
+        return frames
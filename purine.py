@@ -1,23 +1,18 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from store import PURINE_COLUMN
+from schema import shared_dataset
 
 # Set page configuration
 st.set_page_config(page_title="Purine Content Comparison", layout="wide")
 
-# Read the Excel file
-df = pd.read_excel('data/PURINE2023.XLSX', sheet_name=0)
+# Read the cleaned Excel data from the shared store (see `datebooks build`);
+# one compact, read-only copy is shared by every session
+df = shared_dataset('purine_foods')
 
 # Define the exact purine column name
-purine_column = "Total of 4 Purine Bases (mg/100 g)"
-
-# More robust data cleaning - explicitly convert Category column to string first
-df['Category'] = df['Category'].astype(str).fillna('Uncategorized').str.strip()
-df['Food Description'] = df['Food Description'].fillna('Unknown').astype(str).str.strip()
-df[purine_column] = pd.to_numeric(df[purine_column], errors='coerce').fillna(0)
-
-# Remove any empty categories
-df = df[df['Category'] != '']
+purine_column = PURINE_COLUMN
 
 # Add title
 st.title("Food Purine Content Comparison Tool")
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from schema import shared_dataset
+from figcache import cached_figure
 
 # Set page config
 st.set_page_config(
@@ -17,25 +19,14 @@ This application visualizes the relationship between purine content and nutritio
 - 🔵 Blue points represent plant-based foods
 """)
 
-# Read the data
-@st.cache_data  # Cache the data loading
+# Read the data (food_category is precomputed by `datebooks build`). One
+# compact, read-only copy is shared across sessions instead of a cached copy each
 def load_data():
-    df = pd.read_csv('data/purine.csv')
+    df = shared_dataset('purine_density')
     return df
 
 df = load_data()
 
-# Create a function to categorize foods
-def categorize_food(food_name):
-    animal_keywords = ['fish', 'meat', 'liver', 'heart', 'kidney', 'spleen', 
-                      'beef', 'pork', 'chicken', 'lamb', 'veal', 'duck', 
-                      'goose', 'turkey', 'ham', 'sausage', 'mussel', 'shrimp',
-                      'lobster', 'tongue', 'brain', 'lung']
-    return 'Animal-based' if any(keyword in food_name.lower() for keyword in animal_keywords) else 'Plant-based'
-
-# Add category column
-df['food_category'] = df['foodname'].apply(categorize_food)
-
 # Add filters in sidebar
 st.sidebar.header("Filters")
 selected_categories = st.sidebar.multiselect(
@@ -47,8 +38,10 @@ selected_categories = st.sidebar.multiselect(
 # Filter the dataframe
 filtered_df = df[df['food_category'].isin(selected_categories)]
 
-# Create interactive scatter plot
-fig = px.scatter(
+# Create interactive scatter plot (served from the shared figure cache when
+# the filtered data and chart arguments are unchanged)
+fig = cached_figure(
+    px.scatter,
     filtered_df,
     x='purine',
     y='density',
@@ -65,15 +58,14 @@ fig = px.scatter(
         'foodname': 'Food Name',
         'food_category': 'Food Category'
     },
-    trendline="ols"
-)
-
-# Customize layout
-fig.update_layout(
-    height=600,
-    hovermode='closest',
-    template='plotly_white',
-    legend_title_text='Food Type'
+    trendline="ols",
+    # Customize layout
+    layout=dict(
+        height=600,
+        hovermode='closest',
+        template='plotly_white',
+        legend_title_text='Food Type'
+    )
 )
 
 # Show plot
@@ -0,0 +1,129 @@
+"""Compact dtypes for every loaded frame, shared once per process.
+
+Each dataset has a schema mapping columns to a compact dtype: `category` for
+repetitive strings, Arrow-backed `string` for free text, and downcast
+`integer` / `float` numerics. `shared_dataset` loads a store dataset once per
+process with its schema applied and hands every Streamlit session a view of
+that one copy; with copy-on-write a session modifying its frame gets private
+copies of just the columns it changes, so the shared data never changes.
+"""
+import threading
+
+import pandas as pd
+
+from store import build, dataset_path, load_dataset, needs_build, PURINE_BASES, PURINE_COLUMN
+
+STRING_DTYPE = "string[pyarrow]"
+
+SCHEMAS = {
+    "purine_foods": {
+        "Category": "category",
+        "Food Description": "string",
+        **{column: "float" for column in PURINE_BASES},
+        PURINE_COLUMN: "float",
+    },
+    "purine_density": {
+        "foodname": "string",
+        "purine": "float",
+        "density": "float",
+        "food_category": "category",
+    },
+    "birdflu": {
+        "FullGeoName": "string",
+        "FIPS Codes": "string",
+        # Mostly distinct per row, so categories wouldn't save anything
+        "County Name": "string",
+        "State": "category",
+        "Flock Type": "category",
+        "Flock Size": "integer",
+        "State Count": "integer",
+        "Outbreaks": "integer",
+        "Counties": "integer",
+        "Log_Flock_Size": "float",
+    },
+    "country_centroids": {
+        "iso_alpha": "string",
+        "Latitude": "float",
+        "Longitude": "float",
+    },
+    # congress.py's bills_df, built from the Congress.gov API response
+    "bills": {
+        "bill_number": "string",
+        "title": "string",
+        "congress": "integer",
+        "latest_action_text": "category",
+        "bill_type": "category",
+        "bill_url": "string",
+        "sponsors": "string",
+        "sponsor_party": "category",
+        "cosponsors_count": "integer",
+        "bill_id": "string",
+    },
+}
+
+
+def apply_schema(df, schema):
+    """Copy of `df` with compact dtypes for the columns named in `schema`"""
+    columns = {}
+    for column, kind in schema.items():
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if kind == "category":
+            columns[column] = values.astype("category")
+        elif kind == "string":
+            columns[column] = values.astype(STRING_DTYPE)
+        elif kind in ("integer", "unsigned", "float"):
+            columns[column] = pd.to_numeric(values, errors="coerce", downcast=kind)
+        else:
+            raise ValueError(f"Unknown dtype kind {kind!r} for column {column!r}")
+    return df.assign(**columns)
+
+
+def frame_memory(df):
+    """Deep memory usage of a frame in bytes"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(frames):
+    """Rows and memory per named frame, largest first"""
+    report = pd.DataFrame({
+        "rows": {name: len(df) for name, df in frames.items()},
+        "bytes": {name: frame_memory(df) for name, df in frames.items()},
+    })
+    report["MB"] = (report["bytes"] / 2**20).round(3)
+    return report.sort_values("bytes", ascending=False)
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def enable_copy_on_write():
+    """Turn on copy-on-write, which pandas 3 always uses and 2.x has as an option"""
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+# Shallow copies of the shared frames must not let writes reach the original
+enable_copy_on_write()
+
+
+def shared_dataset(name):
+    """Store dataset with its schema applied, loaded once per process.
+
+    Each caller gets a shallow copy sharing the loaded buffers; copy-on-write
+    (enabled on import) copies a column only when a caller modifies it.
+    The dataset is rebuilt when its inputs change, and the frame is reloaded
+    only when its Parquet file is rebuilt.
+    """
+    path = dataset_path(name)
+    with _shared_lock:
+        if needs_build(name):
+            build([name])
+        version = path.stat().st_mtime_ns if path.exists() else None
+        cached = _shared.get(name)
+        if cached is None or cached[0] != version or version is None:
+            df = apply_schema(load_dataset(name), SCHEMAS.get(name, {}))
+            _shared[name] = (dataset_path(name).stat().st_mtime_ns, df)
+        return _shared[name][1].copy(deep=False)
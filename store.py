@@ -0,0 +1,196 @@
+"""Shared columnar store of cleaned datasets.
+
+`datebooks build` turns every raw source under data/ into a cleaned, typed
+Parquet file in data/store. A manifest records the content hash of each
+dataset's inputs, so only datasets whose inputs (or builder version) changed
+are rebuilt, and independent datasets build in parallel. Apps read the
+results with `load_dataset`, which reads the typed Parquet file instead of
+re-parsing the raw CSV/XLSX. The manifest also keeps each input's size and
+mtime, so readers notice a changed input (e.g. appended outbreaks) with a stat
+and rebuild before serving stale data.
+"""
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from outbreaks import clean_outbreaks
+
+DATA_DIR = Path(__file__).parent / "data"
+STORE_DIR = DATA_DIR / "store"
+MANIFEST_PATH = STORE_DIR / "manifest.json"
+
+PURINE_COLUMN = "Total of 4 Purine Bases (mg/100 g)"
+PURINE_BASES = ['Adenine', 'Guanine', 'Hypoxanthine', 'Xanthine']
+ANIMAL_KEYWORDS = ['fish', 'meat', 'liver', 'heart', 'kidney', 'spleen',
+                   'beef', 'pork', 'chicken', 'lamb', 'veal', 'duck',
+                   'goose', 'turkey', 'ham', 'sausage', 'mussel', 'shrimp',
+                   'lobster', 'tongue', 'brain', 'lung']
+
+
+def categorize_food(food_name):
+    return 'Animal-based' if any(keyword in food_name.lower() for keyword in ANIMAL_KEYWORDS) else 'Plant-based'
+
+
+def build_purine_foods(paths):
+    """PURINE2023.XLSX, cleaned the way purine.py needs it"""
+    df = pd.read_excel(paths[0], sheet_name=0)
+    if PURINE_COLUMN not in df.columns:
+        # The 2023 sheet has a second header row holding the units; the total's
+        # full name lives there, under a top-level "Total " header
+        units = df.iloc[0]
+        df = df.rename(columns={column: PURINE_COLUMN for column in df.columns if units[column] == PURINE_COLUMN})
+        df = df.iloc[1:].reset_index(drop=True)
+    # The sheet ends with footnotes and references in the Category column;
+    # real foods always have a description and a purine total
+    df[PURINE_COLUMN] = pd.to_numeric(df[PURINE_COLUMN], errors='coerce')
+    df = df.dropna(subset=['Food Description', PURINE_COLUMN])
+    df['Category'] = df['Category'].fillna('Uncategorized').astype(str).str.strip()
+    df['Food Description'] = df['Food Description'].astype(str).str.strip()
+    # Keep the per-base means; the SEM/min/max columns are mostly "-" placeholders
+    for column in PURINE_BASES:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    df = df[['Category', 'Food Description', *PURINE_BASES, PURINE_COLUMN]]
+    # Remove any empty categories
+    return df[df['Category'] != ''].reset_index(drop=True)
+
+
+def build_purine_density(paths):
+    """purine.csv with the animal/plant category purineapp.py plots"""
+    df = pd.read_csv(paths[0])
+    df['food_category'] = df['foodname'].apply(categorize_food)
+    return df
+
+
+def build_birdflu(paths):
+    return clean_outbreaks(pd.read_csv(paths[0]))
+
+
+def build_country_centroids(paths):
+    return pd.read_csv(paths[0])
+
+
+# Dataset name -> (input files relative to data/, builder, builder version).
+# Bump the version when a builder's output changes so existing artifacts rebuild.
+DATASETS = {
+    "purine_foods": (["PURINE2023.XLSX"], build_purine_foods, 2),
+    "purine_density": (["purine.csv"], build_purine_density, 1),
+    "birdflu": (["birdflu.csv"], build_birdflu, 1),
+    "country_centroids": (["country_centroids.csv"], build_country_centroids, 1),
+}
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def dataset_path(name, store_dir=STORE_DIR):
+    return Path(store_dir) / f"{name}.parquet"
+
+
+def fingerprint(name, data_dir=DATA_DIR):
+    """Content hashes of a dataset's inputs plus its builder version"""
+    inputs, _, version = DATASETS[name]
+    return {
+        "version": version,
+        "inputs": {path: file_hash(Path(data_dir) / path) for path in inputs},
+    }
+
+
+def read_manifest(path=MANIFEST_PATH):
+    if Path(path).exists():
+        return json.loads(Path(path).read_text())
+    return {}
+
+
+def build_dataset(name, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """Build one dataset and write it to the store"""
+    inputs, builder, _ = DATASETS[name]
+    df = builder([Path(data_dir) / path for path in inputs])
+    path = dataset_path(name, store_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename so readers never see a partial file
+    tmp = path.with_name(path.name + '.tmp')
+    df.to_parquet(tmp, index=False)
+    tmp.replace(path)
+    return name
+
+
+def input_stats(name, data_dir=DATA_DIR):
+    """Size and mtime of a dataset's inputs: a cheap check for whether they changed"""
+    inputs, _, _ = DATASETS[name]
+    stats = {}
+    for path in inputs:
+        stat = (Path(data_dir) / path).stat()
+        stats[path] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def stale_datasets(names=None, data_dir=DATA_DIR, store_dir=STORE_DIR, force=False):
+    """Datasets whose inputs changed since the last build, with their new fingerprints"""
+    manifest = read_manifest(Path(store_dir) / MANIFEST_PATH.name)
+    stale = {}
+    for name in names or DATASETS:
+        current = fingerprint(name, data_dir)
+        recorded = {key: manifest.get(name, {}).get(key) for key in current}
+        if force or recorded != current or not dataset_path(name, store_dir).exists():
+            stale[name] = current
+    return stale
+
+
+def needs_build(name, data_dir=DATA_DIR, store_dir=STORE_DIR):
+    """Whether a dataset is missing or its inputs were touched since it was last checked.
+
+    Only stats the inputs; `build` then hashes them to decide whether the
+    dataset really has to be rebuilt.
+    """
+    if not dataset_path(name, store_dir).exists():
+        return True
+    manifest = read_manifest(Path(store_dir) / MANIFEST_PATH.name)
+    return manifest.get(name, {}).get("stats") != input_stats(name, data_dir)
+
+
+def build(names=None, data_dir=DATA_DIR, store_dir=STORE_DIR, force=False, workers=None):
+    """Rebuild the stale datasets in parallel; returns the names that were built"""
+    names = list(names or DATASETS)
+    # Taken before hashing, so a file changing mid-build is caught next time
+    stats = {name: input_stats(name, data_dir) for name in names}
+    stale = stale_datasets(names, data_dir, store_dir, force)
+    built, errors = [], []
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(build_dataset, name, data_dir, store_dir) for name in stale}
+            for name, future in futures.items():
+                try:
+                    built.append(future.result())
+                except Exception as e:
+                    errors.append(e)
+
+    # Record the datasets that did build, even if another one failed, and
+    # refresh the input stats of the ones that were already up to date
+    manifest_path = Path(store_dir) / MANIFEST_PATH.name
+    manifest = read_manifest(manifest_path)
+    for name in names:
+        if name in built:
+            manifest[name] = {**stale[name], "stats": stats[name]}
+        elif name not in stale and name in manifest:
+            manifest[name]["stats"] = stats[name]
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    if errors:
+        raise errors[0]
+    return built
+
+
+def load_dataset(name, store_dir=STORE_DIR):
+    """Cleaned dataset from the store; (re)built first if missing or stale"""
+    if needs_build(name, store_dir=store_dir):
+        build([name], store_dir=store_dir)
+    return pq.read_table(dataset_path(name, store_dir)).to_pandas()